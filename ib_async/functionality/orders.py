@@ -1,5 +1,6 @@
 import asyncio
-import datetime
+import collections
+import functools
 import logging
 import typing
 
@@ -18,44 +19,369 @@ OrderEvent = typing.NamedTuple("OrderEvent", [
     ('average_cost', typing.Optional[float])
 ])
 
+T = typing.TypeVar('T')
+
+
+# Typecodes for the open-order field schemas below, indexing into the tuple returned by _bind_readers
+_STR, _INT, _FLOAT, _BOOL, _DATETIME = range(5)
+
+_SchemaEntry = typing.Tuple[str, int, typing.Optional[ProtocolVersion], typing.Optional[int]]
+_Schema = typing.Tuple[_SchemaEntry, ...]
+_Readers = typing.Tuple[typing.Callable[[], typing.Any], ...]
+
+# Each schema entry is (attribute name, typecode, min_version, min_message_version). The OPEN_ORDER message is split
+# into several schemas, as some blocks are only present when a preceding field is set.
+_OPEN_ORDER_SCHEMA = (  # type: _Schema
+    ('model_code', _STR, ProtocolVersion.MODELS_SUPPORT, None),
+    ('good_till_date', _DATETIME, None, None),
+    ('rule80a', _STR, None, None),
+    ('percent_offset', _FLOAT, None, None),
+    ('settling_firm', _STR, None, None),
+    ('short_sale_slot', _INT, None, None),
+    ('designated_location', _STR, None, None),
+    ('exempt_code', _INT, None, None),
+    ('auction_strategy', _STR, None, None),
+    ('starting_price', _FLOAT, None, None),
+    ('stock_ref_price', _FLOAT, None, None),
+    ('delta', _FLOAT, None, None),
+    ('stock_range_lower', _FLOAT, None, None),
+    ('stock_range_upper', _FLOAT, None, None),
+    ('display_size', _FLOAT, None, None),
+    ('block_order', _BOOL, None, None),
+    ('sweep_to_fill', _BOOL, None, None),
+    ('all_or_none', _BOOL, None, None),
+    ('min_quantity', _FLOAT, None, None),
+    ('oca_type', _INT, None, None),
+    ('etrade_only', _BOOL, None, None),
+    ('firm_quote_only', _BOOL, None, None),
+    ('nbbo_price_cap', _FLOAT, None, None),
+    ('parent_id', _INT, None, None),
+    ('trigger_method', _INT, None, None),
+    ('volatility', _FLOAT, None, None),
+    ('volatility_type', _INT, None, None),
+    ('delta_neutral_order_type', _STR, None, None),
+    ('delta_neutral_aux_price', _FLOAT, None, None),
+)
+
+_DELTA_NEUTRAL_SCHEMA = (  # type: _Schema
+    ('delta_neutral_contract_id', _INT, None, None),
+    ('delta_neutral_settling_firm', _STR, None, None),
+    ('delta_neutral_clearing_account', _STR, None, None),
+    ('delta_neutral_clearing_intent', _STR, None, None),
+    ('delta_neutral_open_close', _STR, None, None),
+    ('delta_neutral_short_sale', _BOOL, None, None),
+    ('delta_neutral_short_sale_slot', _INT, None, None),
+    ('delta_neutral_designated_location', _STR, None, None),
+)
+
+_OPEN_ORDER_TRAIL_SCHEMA = (  # type: _Schema
+    ('continuous_update', _BOOL, None, None),
+    ('reference_price_type', _INT, None, None),
+    ('trail_stop_price', _FLOAT, None, None),
+    ('trailing_percent', _FLOAT, None, None),
+    ('basis_points', _FLOAT, None, None),
+    ('basis_points_type', _INT, None, None),
+    ('combo_legs_description', _STR, None, None),
+)
+
+_OPEN_ORDER_SCALE_SCHEMA = (  # type: _Schema
+    ('scale_init_level_size', _INT, None, None),
+    ('scale_subs_level_size', _INT, None, None),
+    ('scale_price_increment', _FLOAT, None, None),
+)
+
+_SCALE_PRICE_SCHEMA = (  # type: _Schema
+    ('scale_price_adjust_value', _FLOAT, None, 28),
+    ('scale_price_adjust_interval', _INT, None, 28),
+    ('scale_profit_offset', _FLOAT, None, 28),
+    ('scale_auto_reset', _BOOL, None, 28),
+    ('scale_init_position', _INT, None, 28),
+    ('scale_init_fill_quantity', _INT, None, 28),
+    ('scale_random_percent', _FLOAT, None, 28),
+)
+
+_OPEN_ORDER_CLEARING_SCHEMA = (  # type: _Schema
+    ('opt_out_smart_routing', _BOOL, None, 25),
+    ('clearing_account', _STR, None, None),
+    ('clearing_intent', _STR, None, None),
+    ('not_held', _BOOL, None, 22),
+)
+
+_OPEN_ORDER_STATUS_SCHEMA = (  # type: _Schema
+    ('solicited', _BOOL, None, 33),
+    ('what_if', _BOOL, None, None),
+    ('status', _STR, None, None),
+    ('inital_margin', _STR, None, None),
+    ('maintenance_margin', _STR, None, None),
+    ('equity_with_loan', _STR, None, None),
+    ('commission', _FLOAT, None, None),
+    ('min_commission', _FLOAT, None, None),
+    ('max_commission', _FLOAT, None, None),
+    ('commission_currency', _STR, None, None),
+    ('warning_text', _STR, None, None),
+    ('randomize_size', _BOOL, None, 34),
+    ('randomize_price', _BOOL, None, 34),
+)
+
+_PEGGED_TO_BENCHMARK_SCHEMA = (  # type: _Schema
+    ('reference_contract_id', _INT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('is_pegged_change_amount_decrease', _BOOL, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('pegged_change_amount', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('reference_change_amount', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('reference_exchange_id', _STR, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+)
+
+_OPEN_ORDER_ADJUSTED_SCHEMA = (  # type: _Schema
+    ('adjusted_order_type', _STR, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('trigger_price', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('trail_stop_price', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('limit_price_offset', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('adjusted_stop_price', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('adjusted_stop_limit_price', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('adjusted_trailing_amount', _FLOAT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('adjustable_trailing_unit', _INT, ProtocolVersion.PEGGED_TO_BENCHMARK, None),
+    ('soft_dollar_tier_name', _STR, ProtocolVersion.SOFT_DOLLAR_TIER, None),
+    ('soft_dollar_tier_value', _STR, ProtocolVersion.SOFT_DOLLAR_TIER, None),
+    ('soft_dollar_tier_display_name', _STR, ProtocolVersion.SOFT_DOLLAR_TIER, None),
+    ('cash_quantity', _FLOAT, ProtocolVersion.CASH_QTY, None),
+)
+
+_OPEN_ORDER_LAZY_FIELDS = frozenset(name for name, _, _, _ in _OPEN_ORDER_ADJUSTED_SCHEMA)
+
+
+def _bind_readers(message: IncomingMessage) -> _Readers:
+    """Returns the type-specialized readers of the message, in typecode order."""
+    return message.read_str, message.read_int, message.read_float, message.read_bool, message.read_datetime
+
+
+def _read_schema(message: IncomingMessage, readers: _Readers, schema: _Schema, fields: typing.Dict[str, typing.Any]):
+    """Read the fields described by schema from the message into the fields dict."""
+    protocol_version = message.protocol_version
+    message_version = message.message_version
+    for name, typecode, min_version, min_message_version in schema:
+        if min_version and min_version > protocol_version:
+            value = None
+        elif min_message_version and min_message_version > message_version:
+            value = None
+        else:
+            value = readers[typecode]()
+        fields[name] = value
+
+
+class _OpenOrderTail(IncomingMessage):
+    """The undecoded trailing fields of an OPEN_ORDER message.
+
+    Only those fields are kept, along with the versions needed to decode them, so they decode the same however long
+    after the message the order is read, even if the connection has changed since."""
+
+    def __init__(self, message: IncomingMessage) -> None:
+        # Not calling IncomingMessage.__init__, the message type and version were already read from the message
+        self.fields = message.fields[message.idx:]
+        self.idx = 0
+        self.message_type = message.message_type
+        self.message_version = message.message_version
+        self._protocol_version = message.protocol_version
+
+    @property
+    def protocol_version(self):
+        return self._protocol_version
+
+    def reset(self):
+        self.idx = 0
+
+
+def _read_open_order_tail(tail: _OpenOrderTail, order: Order):
+    """Decode the lazily parsed trailing fields of an OPEN_ORDER message."""
+    tail.reset()
+    fields = {}  # type: typing.Dict[str, typing.Any]
+    _read_schema(tail, _bind_readers(tail), _OPEN_ORDER_ADJUSTED_SCHEMA, fields)
+
+    # Don't overwrite fields that were assigned since the order was received
+    for name, value in fields.items():
+        order.__dict__.setdefault(name, value)
+
+
+class _OrderIdMap(typing.Generic[T]):
+    """A mapping from order ids to values.
+
+    Order ids are handed out sequentially by the client, so values are stored in a list indexed by the offset of the
+    order id from the first of the client's own ids (see anchor()). Ids outside of that range (e.g. orders placed by
+    other clients) are kept in a dict instead.
+    """
+
+    # Ids that would leave more than this many empty slots in the list are stored in the overflow dict
+    MAX_GAP = 1024
+
+    # The list is grown in blocks of this many slots, to avoid reallocating it for every new order
+    GROW_BY = 4096
+
+    def __init__(self) -> None:
+        self._base = None  # type: typing.Optional[int]
+        self._slots = []  # type: typing.List[typing.Optional[T]]
+        self._overflow = {}  # type: typing.Dict[int, T]
+
+    def get(self, order_id: int, default: typing.Optional[T] = None) -> typing.Optional[T]:
+        if self._base is not None:
+            idx = order_id - self._base
+            if 0 <= idx < len(self._slots):
+                value = self._slots[idx]
+                return default if value is None else value
+
+        return self._overflow.get(order_id, default)
+
+    def get_or_create(self, order_id: int, factory: typing.Callable[[], T]) -> T:
+        """Returns the value for order_id, storing a new one made by factory if there is none yet."""
+        if self._base is not None:
+            idx = order_id - self._base
+            if 0 <= idx < len(self._slots):
+                value = self._slots[idx]
+                if value is None:
+                    value = self._slots[idx] = factory()
+                return value
+
+        value = self._overflow.get(order_id)
+        if value is None:
+            value = self[order_id] = factory()
+        return value
+
+    def __contains__(self, order_id: int) -> bool:
+        return self.get(order_id) is not None
+
+    def anchor(self, order_id: int):
+        """Starts the list at order_id, unless it was already started.
+
+        Only ids handed out by the client should be used here, ids of orders placed elsewhere may be anywhere."""
+        if self._base is None:
+            self._base = order_id
+            self._grow(self.GROW_BY)
+
+    def __setitem__(self, order_id: int, value: T):
+        if self._base is None:
+            self._overflow[order_id] = value
+            return
+
+        idx = order_id - self._base
+        if 0 <= idx < len(self._slots):
+            self._slots[idx] = value
+        elif len(self._slots) <= idx < len(self._slots) + self.MAX_GAP:
+            self._grow(max(self.GROW_BY, idx - len(self._slots) + 1))
+            self._slots[idx] = value
+        else:
+            self._overflow[order_id] = value
+
+    def _grow(self, count: int):
+        self._slots.extend([None] * count)
+
+        # Ids that were kept in the overflow dict may now fall within the list, move them over so lookups find them
+        if self._overflow:
+            end = self._base + len(self._slots)
+            for order_id in [key for key in self._overflow if self._base <= key < end]:
+                self._slots[order_id - self._base] = self._overflow.pop(order_id)
+
+    def pop(self, order_id: int, default: typing.Optional[T] = None) -> typing.Optional[T]:
+        if self._base is not None:
+            idx = order_id - self._base
+            if 0 <= idx < len(self._slots):
+                value = self._slots[idx]
+                if value is None:
+                    return default
+                self._slots[idx] = None
+                return value
+
+        return self._overflow.pop(order_id, default)
+
+    def values(self) -> typing.Iterator[T]:
+        yield from (value for value in self._slots if value is not None)
+        yield from self._overflow.values()
+
 
-def _dummy_handler__for_get_orders(PositionEvent):
-    # This event handler is just used as a dummy to trigger the event subscribe/unsubscribe mechanisms
-    pass
+class _DigestCache:
+    """Remembers a digest of the last OPEN_ORDER message seen for each order id.
+
+    The cache is bounded, and evicts the least recently used entry when full.
+    """
+
+    MAX_SIZE = 4096
+
+    def __init__(self) -> None:
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict[int, int]  # order_id -> digest
+
+    def matches(self, order_id: int, digest: int) -> bool:
+        if self._entries.get(order_id) == digest:
+            self._entries.move_to_end(order_id)
+            return True
+        return False
+
+    def store(self, order_id: int, digest: int):
+        if order_id in self._entries:
+            self._entries.move_to_end(order_id)
+        elif len(self._entries) >= self.MAX_SIZE:
+            self._entries.popitem(last=False)
+        self._entries[order_id] = digest
+
+    def discard(self, order_id: int):
+        self._entries.pop(order_id, None)
 
 
 class OrdersMixin(ProtocolInterface):
     def __init__(self):
         super().__init__()
-        self.__orders = {}  # type: typing.Dict[int, Order]
+        self.__orders = _OrderIdMap()  # type: _OrderIdMap[Order]
         self._next_order_id = 1
-        self.__submitted_future = {}
+        self.__submitted_future = _OrderIdMap()  # type: _OrderIdMap[asyncio.Future]
         self.__open_orders_future = None
+        # While replaying all open orders (i.e. while __open_orders_future is pending), update notifications are held
+        # back until the end of the replay
+        self.__replayed_orders = {}  # type: typing.Dict[int, Order]
+        # Order updates are coalesced, and reported once per event loop iteration
+        self.__pending_updates = {}  # type: typing.Dict[int, Order]
+        # The loop a flush of the pending updates is scheduled on, if any
+        self.__updates_flush_loop = None  # type: typing.Optional[asyncio.AbstractEventLoop]
+        self.__open_order_digests = _DigestCache()
+        self.__new_order = functools.partial(Order, self)
 
     def get_order(self, order_id: int) -> typing.Optional[Order]:
         """Returns the order, if it is known. Note that the client doesn't know about all orders."""
         return self.__orders.get(order_id)
 
     def get_open_orders(self) -> typing.Awaitable[typing.List[Order]]:
-        if not self.__open_orders_future:
+        if not self.__replay_in_progress:
             self.__open_orders_future = asyncio.Future()
+            # If the caller gives up on the replay (e.g. on a timeout), stop holding back notifications
+            self.__open_orders_future.add_done_callback(self.__replay_finished)
 
         self.send_message(Outgoing.REQ_ALL_OPEN_ORDERS, 1)
         return self.__open_orders_future
 
-    def _handle_open_order_end(self):
-        if self.__open_orders_future:
-            self.__open_orders_future.set_result(self.__orders.values())
-            self.__open_orders_future = None
+    @property
+    def __replay_in_progress(self) -> bool:
+        return self.__open_orders_future is not None and not self.__open_orders_future.done()
 
-    def create_market_order(self, instrument: Instrument, quantity: float, action: Action = None,
-                            time_in_force=TimeInForce.GoodTillCancel,
-                            place=True) -> "asyncio.Future[Order]":
+    def __replay_finished(self, future: asyncio.Future):
+        if future is not self.__open_orders_future:
+            return  # already handled, or a newer replay was started
+
+        self.__open_orders_future = None
+        replayed_orders, self.__replayed_orders = self.__replayed_orders, {}
+        for order in replayed_orders.values():
+            self.__notify_updated(order)
+
+    def _handle_open_order_end(self):
+        future = self.__open_orders_future
+        if future is not None:
+            if not future.done():
+                future.set_result(list(self.__orders.values()))
+            self.__replay_finished(future)
+
+    def _build_order(self, instrument: Instrument, quantity: float, action: typing.Optional[Action],
+                     time_in_force: TimeInForce, order_type: OrderType, limit_price: float = None) -> Order:
         order = Order(self)
         order.instrument = instrument
-
-        order.order_type = OrderType.Market
+        order.order_type = order_type
         order.time_in_force = time_in_force
+        if limit_price is not None:
+            order.limit_price = limit_price
+
         if action is None:
             order.action = Action.Buy if quantity > 0 else Action.Sell
             order.total_quantity = abs(quantity)
@@ -63,26 +389,32 @@ class OrdersMixin(ProtocolInterface):
             order.action = action
             order.total_quantity = quantity
 
+        return order
+
+    def create_market_order_sync(self, instrument: Instrument, quantity: float, action: Action = None,
+                                 time_in_force=TimeInForce.GoodTillCancel) -> Order:
+        """Creates a market order, without placing it."""
+        return self._build_order(instrument, quantity, action, time_in_force, OrderType.Market)
+
+    def create_market_order(self, instrument: Instrument, quantity: float, action: Action = None,
+                            time_in_force=TimeInForce.GoodTillCancel,
+                            place=True) -> "asyncio.Future[Order]":
+        order = self.create_market_order_sync(instrument, quantity, action, time_in_force)
+
         if place:
             return self.place_order(order)
         else:
             return wrap_immediate_future(order)
 
+    def create_limit_order_sync(self, instrument: Instrument, quantity: float, limit: float, action: Action = None,
+                                time_in_force=TimeInForce.GoodTillCancel) -> Order:
+        """Creates a limit order, without placing it."""
+        return self._build_order(instrument, quantity, action, time_in_force, OrderType.Limit, limit_price=limit)
+
     def create_limit_order(self, instrument: Instrument, quantity: float, limit: float, action: Action = None,
                            time_in_force=TimeInForce.GoodTillCancel,
                            place=True) -> "asyncio.Future[Order]":
-        order = Order(self)
-        order.instrument = instrument
-        order.order_type = OrderType.Limit
-        order.limit_price = limit
-        order.time_in_force = time_in_force
-
-        if action is None:
-            order.action = Action.Buy if quantity > 0 else Action.Sell
-            order.total_quantity = abs(quantity)
-        else:
-            order.action = action
-            order.total_quantity = quantity
+        order = self.create_limit_order_sync(instrument, quantity, limit, action, time_in_force)
 
         if place:
             return self.place_order(order)
@@ -92,12 +424,15 @@ class OrdersMixin(ProtocolInterface):
     def place_order(self, order: Order) -> "asyncio.Future[Order]":
         if not order.order_id:
             order.order_id = self._next_order_id
+            self.__anchor_order_ids(order.order_id)
 
+        future = asyncio.Future()  # type: asyncio.Future
         self.__orders[order.order_id] = order
-        self.__submitted_future[order.order_id] = asyncio.Future()
+        self.__open_order_digests.discard(order.order_id)  # the order may have been modified locally
+        self.__submitted_future[order.order_id] = future
         self.send_message(Outgoing.PLACE_ORDER, 45, order)
 
-        return self.__submitted_future[order.order_id]
+        return future
 
     def _handle_order_status(self, order_id: int, status: str, filled: float, remaining: float,
                              average_fill_price: float,
@@ -116,11 +451,34 @@ class OrdersMixin(ProtocolInterface):
             order.why_held = why_held
             order.market_cap_price = market_cap_price
 
-            order.updated(None)
+            self.__notify_updated(order)
+            self.__resolve_submitted(order)
+
+    def __notify_updated(self, order: Order):
+        """Reports an update of the order.
+
+        Both OPEN_ORDER and ORDER_STATUS updates are coalesced, and reported once per event loop iteration, so
+        subscribers see them in the order they arrived."""
+        self.__pending_updates[order.order_id] = order
+
+        # A flush scheduled on another loop may never run (e.g. if that loop was stopped or closed since), so schedule
+        # it again on the current one
+        loop = asyncio.get_event_loop()
+        if self.__updates_flush_loop is not loop or loop.is_closed():
+            self.__updates_flush_loop = loop
+            loop.call_soon(self.__flush_updates, loop)
 
-            submitted_fut = self.__submitted_future.pop(order_id, None)
-            if submitted_fut:
-                submitted_fut.set_result(order)
+    def __flush_updates(self, loop: asyncio.AbstractEventLoop):
+        if loop is not self.__updates_flush_loop:
+            return  # Superseded by a flush scheduled on another loop
+
+        self.__updates_flush_loop = None
+        pending_updates, self.__pending_updates = self.__pending_updates, {}
+        for order in pending_updates.values():
+            try:
+                order.updated(None)
+            except Exception:
+                LOG.exception("Error while reporting an update of order %s", order.order_id)
 
     def _handle_open_order(self, order_id: int, instrument: Instrument,
                            action: Action, total_quantity: float, order_type: OrderType,
@@ -132,178 +490,123 @@ class OrdersMixin(ProtocolInterface):
                            _deprecated_shares_allocation: str,
                            fa_group: str, fa_method: str, fa_percentage: str, fa_profile: str,
                            message: IncomingMessage):
-        order = self.__orders.get(order_id)
-        if not order:
-            order = self.__orders[order_id] = Order(self)
-            order.order_id = order_id
-
-        order.order_id = order_id
-        order.perm_id = perm_id
-        order.instrument = instrument
-        order.action = action
-        order.total_quantity = total_quantity
-        order.order_type = order_type
-        order.limit_price = limit_price
-        order.aux_price = aux_price
-        order.time_in_force = time_in_force
-        order.oca_group = oca_group
-        order.account = account
-        order.open_close = open_close
-        order.origin = origin
-        order.order_ref = order_ref
-        order.client_id = client_id
-        order.outside_regular_trading_hours = outside_regular_trading_hours
-        order.hidden = hidden
-        order.discretionary_amount = discretionary_amount
-        order.good_after_time = good_after_time
-        order.fa_group = fa_group
-        order.fa_method = fa_method
-        order.fa_percentage = fa_percentage
-        order.fa_profile = fa_profile
-
-        order.model_code = message.read(min_version=ProtocolVersion.MODELS_SUPPORT)
-        order.good_till_date = message.read(datetime.datetime)
-        order.rule80a = message.read()
-        order.percent_offset = message.read(float)
-        order.settling_firm = message.read()
-        order.short_sale_slot = message.read(int)
-        order.designated_location = message.read()
-        order.exempt_code = message.read(int)
-        order.auction_strategy = message.read()
-        order.starting_price = message.read(float)
-        order.stock_ref_price = message.read(float)
-        order.delta = message.read(float)
-        order.stock_range_lower = message.read(float)
-        order.stock_range_upper = message.read(float)
-        order.display_size = message.read(float)
-
-        order.block_order = message.read(bool)
-        order.sweep_to_fill = message.read(bool)
-        order.all_or_none = message.read(bool)
-        order.min_quantity = message.read(float)
-        order.oca_type = message.read(int)
-        order.etrade_only = message.read(bool)
-        order.firm_quote_only = message.read(bool)
-        order.nbbo_price_cap = message.read(float)
-        order.parent_id = message.read(int)
-        order.trigger_method = message.read(int)
-        order.volatility = message.read(float)
-        order.volatility_type = message.read(int)
-        order.delta_neutral_order_type = message.read()
-        order.delta_neutral_aux_price = message.read(float)
-
-        if order.delta_neutral_order_type:  # pragma: no cover  (I don't have actual examples of these)
-            order.delta_neutral_contract_id = message.read(int)
-            order.delta_neutral_settling_firm = message.read()
-            order.delta_neutral_clearing_account = message.read()
-            order.delta_neutral_clearing_intent = message.read()
-            order.delta_neutral_open_close = message.read()
-            order.delta_neutral_short_sale = message.read(bool)
-            order.delta_neutral_short_sale_slot = message.read(int)
-            order.delta_neutral_designated_location = message.read()
-
-        order.continuous_update = message.read(bool)
-        order.reference_price_type = message.read(int)
-        order.trail_stop_price = message.read(float)
-        order.trailing_percent = message.read(float)
-        order.basis_points = message.read(float)
-        order.basis_points_type = message.read(int)
-        order.combo_legs_description = message.read(str)
-
-        if message.read(int):  # pragma: no cover  (Not implemented)
+        order = self.__orders.get_or_create(order_id, self.__new_order)
+        digest = hash(tuple(message.fields))
+        if self.__open_order_digests.matches(order_id, digest):
+            # TWS frequently resends identical snapshots (e.g. on reconnect), the order is already up to date
+            self.__open_order_received(order)
+            return
+
+        readers = _bind_readers(message)
+        read_str, read_int = readers[_STR], readers[_INT]
+
+        # Collect all fields first, and apply them to the order in one go
+        fields = {
+            'order_id': order_id,
+            'perm_id': perm_id,
+            'instrument': instrument,
+            'action': action,
+            'total_quantity': total_quantity,
+            'order_type': order_type,
+            'limit_price': limit_price,
+            'aux_price': aux_price,
+            'time_in_force': time_in_force,
+            'oca_group': oca_group,
+            'account': account,
+            'open_close': open_close,
+            'origin': origin,
+            'order_ref': order_ref,
+            'client_id': client_id,
+            'outside_regular_trading_hours': outside_regular_trading_hours,
+            'hidden': hidden,
+            'discretionary_amount': discretionary_amount,
+            'good_after_time': good_after_time,
+            'fa_group': fa_group,
+            'fa_method': fa_method,
+            'fa_percentage': fa_percentage,
+            'fa_profile': fa_profile,
+        }  # type: typing.Dict[str, typing.Any]
+
+        _read_schema(message, readers, _OPEN_ORDER_SCHEMA, fields)
+
+        if fields['delta_neutral_order_type']:  # pragma: no cover  (I don't have actual examples of these)
+            _read_schema(message, readers, _DELTA_NEUTRAL_SCHEMA, fields)
+
+        _read_schema(message, readers, _OPEN_ORDER_TRAIL_SCHEMA, fields)
+
+        if read_int():  # pragma: no cover  (Not implemented)
             raise UnsupportedFeature("combo legs")
 
-        if message.read(int):  # pragma: no cover  (Not implemented)
+        if read_int():  # pragma: no cover  (Not implemented)
             raise UnsupportedFeature("order combo legs")
 
-        order.smart_combo_routing_params = message.read(typing.Dict[str, str])
-        order.scale_init_level_size = message.read(int)
-        order.scale_subs_level_size = message.read(int)
-        order.scale_price_increment = message.read(float)
-
-        if order.scale_price_increment:  # pragma: no cover  (I don't have actual examples of these)
-            order.scale_price_adjust_value = message.read(float, min_message_version=28)
-            order.scale_price_adjust_interval = message.read(int, min_message_version=28)
-            order.scale_profit_offset = message.read(float, min_message_version=28)
-            order.scale_auto_reset = message.read(bool, min_message_version=28)
-            order.scale_init_position = message.read(int, min_message_version=28)
-            order.scale_init_fill_quantity = message.read(int, min_message_version=28)
-            order.scale_random_percent = message.read(float, min_message_version=28)
-
-        order.hedge_type = message.read(str, min_message_version=24)
-        if order.hedge_type:  # pragma: no cover  (I don't have actual examples of these)
-            order.hedge_param = message.read(str)
+        smart_combo_routing_params = {}  # type: typing.Dict[str, str]
+        message.read_str_str_pairs_into(smart_combo_routing_params)
+        fields['smart_combo_routing_params'] = smart_combo_routing_params
+        _read_schema(message, readers, _OPEN_ORDER_SCALE_SCHEMA, fields)
 
-        order.opt_out_smart_routing = message.read(bool, min_message_version=25)
+        if fields['scale_price_increment']:  # pragma: no cover  (I don't have actual examples of these)
+            _read_schema(message, readers, _SCALE_PRICE_SCHEMA, fields)
 
-        order.clearing_account = message.read(str)
-        order.clearing_intent = message.read(str)
+        fields['hedge_type'] = message.read(str, min_message_version=24)
+        if fields['hedge_type']:  # pragma: no cover  (I don't have actual examples of these)
+            fields['hedge_param'] = read_str()
 
-        order.not_held = message.read(bool, min_message_version=22)
+        _read_schema(message, readers, _OPEN_ORDER_CLEARING_SCHEMA, fields)
 
         if message.read(bool, min_message_version=20):  # pragma: no cover  (I don't have actual examples of these)
-            order.instrument.underlying_component = message.read(UnderlyingComponent)
+            instrument.underlying_component = message.read(UnderlyingComponent)
 
-        order.algo_strategy = message.read(str, min_message_version=21)
-        if order.algo_strategy:  # pragma: no cover  (I don't have actual examples of these)
-            order.algo_parameters = message.read(dict)
+        fields['algo_strategy'] = message.read(str, min_message_version=21)
+        if fields['algo_strategy']:  # pragma: no cover  (I don't have actual examples of these)
+            algo_parameters = {}  # type: typing.Dict[str, str]
+            message.read_str_str_pairs_into(algo_parameters)
+            fields['algo_parameters'] = algo_parameters
 
-        order.solicited = message.read(bool, min_message_version=33)
+        _read_schema(message, readers, _OPEN_ORDER_STATUS_SCHEMA, fields)
 
-        order.what_if = message.read(bool)
-
-        order.status = message.read()
-        order.inital_margin = message.read()
-        order.maintenance_margin = message.read()
-        order.equity_with_loan = message.read()
-        order.commission = message.read(float)
-        order.min_commission = message.read(float)
-        order.max_commission = message.read(float)
-        order.commission_currency = message.read()
-        order.warning_text = message.read()
-
-        order.randomize_size = message.read(bool, min_message_version=34)
-        order.randomize_price = message.read(bool, min_message_version=34)
-
-        if order.order_type == "PEG BENCH":  # pragma: no cover  (I don't have actual examples of these)
-            order.reference_contract_id = message.read(int, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-            order.is_pegged_change_amount_decrease = message.read(bool, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-            order.pegged_change_amount = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-            order.reference_change_amount = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-            order.reference_exchange_id = message.read(min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
+        if order_type is OrderType.PeggedToBenchmark:  # pragma: no cover  (I don't have actual examples of these)
+            _read_schema(message, readers, _PEGGED_TO_BENCHMARK_SCHEMA, fields)
 
         if message.read(int, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK):  # pragma: no cover  (not implemented)
             raise UnsupportedFeature("order conditions")
 
-        order.adjusted_order_type = message.read(min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.trigger_price = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.trail_stop_price = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.limit_price_offset = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.adjusted_stop_price = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.adjusted_stop_limit_price = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.adjusted_trailing_amount = message.read(float, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-        order.adjustable_trailing_unit = message.read(int, min_version=ProtocolVersion.PEGGED_TO_BENCHMARK)
-
-        order.soft_dollar_tier_name = message.read(min_version=ProtocolVersion.SOFT_DOLLAR_TIER)
-        order.soft_dollar_tier_value = message.read(min_version=ProtocolVersion.SOFT_DOLLAR_TIER)
-        order.soft_dollar_tier_display_name = message.read(min_version=ProtocolVersion.SOFT_DOLLAR_TIER)
-
-        order.cash_quantity = message.read(float, min_version=ProtocolVersion.CASH_QTY)
+        # The remaining fields are rarely used, and only decoded when first accessed
+        order.__dict__.update(fields)
+        for name in _OPEN_ORDER_LAZY_FIELDS:
+            order.__dict__.pop(name, None)
+        order._lazy_fields = (_OPEN_ORDER_LAZY_FIELDS,
+                              functools.partial(_read_open_order_tail, _OpenOrderTail(message)))
+        self.__open_order_digests.store(order_id, digest)
+        self.__open_order_received(order)
+
+    def __open_order_received(self, order: Order):
+        self.__resolve_submitted(order)
+        if self.__replay_in_progress:
+            self.__replayed_orders[order.order_id] = order
+        else:
+            self.__notify_updated(order)
 
-        submitted_fut = self.__submitted_future.pop(order_id, None)
-        if submitted_fut:
+    def __resolve_submitted(self, order: Order):
+        submitted_fut = self.__submitted_future.pop(order.order_id, None)
+        # The caller may have cancelled the future while waiting for the order to be acknowledged
+        if submitted_fut and not submitted_fut.done():
             submitted_fut.set_result(order)
 
-        order.updated(None)
+    def __anchor_order_ids(self, order_id: int):
+        """Keeps orders with ids handed out by this client, from order_id on, in the lists of the order id maps."""
+        self.__orders.anchor(order_id)
+        self.__submitted_future.anchor(order_id)
 
     def _handle_next_valid_id(self, next_order_id: int):
         self._next_order_id = next_order_id
+        self.__anchor_order_ids(next_order_id)
 
     def _handle_err_msg(self, request_id: int, error_code: int, error_message: str):
         # We need to specially handle this case, as order_ids are reused.
-        fut = self.__submitted_future.pop(request_id, None)
-
-        if fut:
-            fut.set_exception(ApiException(error_code, error_message))
+        if request_id in self.__submitted_future:
+            fut = self.__submitted_future.pop(request_id)
+            if not fut.done():
+                fut.set_exception(ApiException(error_code, error_message))
         else:
             super()._handle_err_msg(request_id, error_code, error_message)  # type: ignore  # noqa
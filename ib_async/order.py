@@ -96,6 +96,7 @@ class TimeInForce(str, enum.Enum):
 class Order(Serializable):
     def __init__(self, parent: ProtocolInterface) -> None:
         self._parent = parent
+        self._lazy_fields = None  # type: typing.Optional[typing.Tuple[typing.FrozenSet[str], typing.Callable]]
         self.instrument = None  # type: Instrument
 
         # Filled by status messages
@@ -103,10 +104,10 @@ class Order(Serializable):
         self.filled = None  # type: float
         self.remaining = None  # type: float
         self.average_fill_price = None  # type: float
-        self.perm_id = None  # type: int
-        self.parent_id = None  # type: int
+        self.perm_id = 0
+        self.parent_id = 0
         self.last_fill_price = None  # type: float
-        self.client_id = None  # type: int
+        self.client_id = 0
         self.why_held = None  # type: str
         self.market_cap_price = None  # type: float
 
@@ -122,8 +123,6 @@ class Order(Serializable):
         self.warning_text = None  # type: str
 
         self.order_id = 0
-        self.client_id = 0
-        self.perm_id = 0
 
         # main order fields
         self.action = None  # type: Action
@@ -148,7 +147,6 @@ class Order(Serializable):
         self.oca_type = 0
         self.order_reference = ""
         self.transmit = True
-        self.parent_id = 0
         self.block_order = False
         self.sweep_to_fill = False
         self.display_size = 0
@@ -295,6 +293,17 @@ class Order(Serializable):
     updated = Event()  # type: Event[None]
     on_execution = Event()  # type: Event[execution.Execution]
 
+    def __getattr__(self, name: str):
+        # Some fields of received orders are only decoded when first accessed. _lazy_fields holds the names of those
+        # fields, and a function that decodes them onto the order.
+        lazy_fields = self.__dict__.get('_lazy_fields')
+        if lazy_fields is None or name not in lazy_fields[0]:
+            raise AttributeError(name)
+
+        lazy_fields[1](self)
+        self._lazy_fields = None
+        return self.__dict__[name]
+
     def serialize(self, message: OutgoingMessage):
         message.add(self.order_id)
         message.add(self.instrument)
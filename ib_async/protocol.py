@@ -110,6 +110,53 @@ class IncomingMessage:
         self.field_parsed[idx] = result  # type:ignore
         return result
 
+    # Type-specialized readers. These skip the type dispatch and version checks of read(), for use on hot paths
+    # where the field type is known up-front.
+
+    def read_str(self) -> str:
+        text = self.fields[self.idx]
+        self.idx += 1
+        return text
+
+    def read_int(self) -> typing.Optional[int]:
+        text = self.fields[self.idx]
+        self.idx += 1
+        if not text:
+            return None
+        result = int(text)
+        return None if result >= 2147483647 else result
+
+    def read_float(self) -> typing.Optional[float]:
+        text = self.fields[self.idx]
+        self.idx += 1
+        if not text:
+            return None
+        result = float(text)
+        return None if result >= 1.7976931348623157E308 else result
+
+    def read_bool(self) -> typing.Optional[bool]:
+        text = self.fields[self.idx]
+        self.idx += 1
+        if not text:
+            return None
+        return int(text) != 0
+
+    def read_datetime(self) -> typing.Optional[datetime.datetime]:
+        text = self.fields[self.idx]
+        self.idx += 1
+        if not text:
+            return None
+        return datetime.datetime.strptime(text, "%Y%m%d  %H:%M:%S")
+
+    def read_str_str_pairs_into(self, target: typing.Dict[str, str]):
+        """Read a count-prefixed list of key/value pairs, storing them directly into target."""
+        count = self.fields[self.idx]
+        self.idx += 1
+        for _ in range(int(count or 0)):
+            key = self.fields[self.idx]
+            target[key] = self.fields[self.idx + 1]
+            self.idx += 2
+
     def _read_inner(self, the_type: typing.Type[T]) -> T:  # type: ignore
         """Consume one or more network-representation fields, and turn it into the provided python type."""
 
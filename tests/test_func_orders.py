@@ -1,15 +1,29 @@
+import asyncio
+
 import pytest
 
 from ib_async.errors import ApiException
-from ib_async.functionality.orders import OrdersMixin, Action
+from ib_async.functionality.orders import OrdersMixin, Action, _OrderIdMap, _DigestCache
 from ib_async.protocol import Incoming, ProtocolVersion
-from .utils import FunctionalityTestHelper
+from .utils import FunctionalityTestHelper, run_event_loop
 
 
 class MixinFixture(OrdersMixin, FunctionalityTestHelper):
     pass
 
 
+OPEN_ORDER_MESSAGE = (Incoming.OPEN_ORDER, 34, 1, 265598, 'AAPL', 'STK', '', 0, '?', '', 'SMART', 'USD',
+                      'AAPL', 'NMS', 'BUY', 1, 'LMT', '183.0', '0.0', 'GTC', '', 'DU228241', 'O', 0, '', 1,
+                      176952797, 0, 0, 0, '', '176952797.0/DU228241/100', '', '', '', '', '', '', '', '', '',
+                      0, '', '-1', 0, '', '', '', '', '', '', 0, 0, 0, '', 3, 1, 1, '', 0, 0, '',
+                      0, 'None', '', 0, '', '', '', '?', 0, 0, '', 0, 0, '', '', '', '', '', 0, 0,
+                      0, '', '', '', '', 0, '', 'IB', 0, 0, '', 0, 0, 'Submitted',
+                      '1.7976931348623157E308', '1.7976931348623157E308', '1.7976931348623157E308', '', '', '', '',
+                      '', 0, 0, 0, 'None', '1.7976931348623157E308', '184.0', '1.7976931348623157E308',
+                      '1.7976931348623157E308', '1.7976931348623157E308', '1.7976931348623157E308', 0, '', '', '',
+                      '1.7976931348623157E308')
+
+
 def test_mk_limit():
     client = MixinFixture()
     client.version = ProtocolVersion.MAX_CLIENT
@@ -84,6 +98,135 @@ def test_mk_market():
     assert fut.result().action == Action.Sell
 
 
+def test_mk_sync():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    order = client.create_market_order_sync(client.test_instrument, -1)
+    assert not client.sent
+    assert order.total_quantity == 1
+    assert order.action == Action.Sell
+
+    order = client.create_limit_order_sync(client.test_instrument, 2, 100, action=Action.Sell)
+    assert not client.sent
+    assert order.total_quantity == 2
+    assert order.limit_price == 100
+    assert order.action == Action.Sell
+
+
+def test_mk_cancelled():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    fut = client.create_market_order(client.test_instrument, 1)
+    fut.cancel()
+
+    # The status update must not try to resolve the cancelled future
+    client.fake_incoming(Incoming.ORDER_STATUS, 1, 'Submitted', 0, 1, 0, 176952797, 0, 0, 1, '', 0)
+    assert client.get_order(1).status == 'Submitted'
+
+
+def test_order_status_coalesced():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    fut = client.create_market_order(client.test_instrument, 1)
+    order = client.get_order(1)
+
+    updates = []
+
+    def on_updated(value):
+        updates.append(order.filled)
+
+    order.updated += on_updated
+
+    client.fake_incoming(Incoming.ORDER_STATUS, 1, 'Submitted', 0, 1, 0, 176952797, 0, 0, 1, '', 0)
+    client.fake_incoming(Incoming.ORDER_STATUS, 1, 'Filled', 1, 0, 0, 176952797, 0, 0, 1, '', 0)
+
+    # The submit future resolves immediately, the update is reported once on the next loop iteration
+    assert fut.done()
+    assert updates == []
+    run_event_loop()
+    assert updates == [1]
+
+
+def test_order_updates_across_event_loops():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    async def place(order_id):
+        client.create_market_order(client.test_instrument, 1, place=False)
+        client._next_order_id = order_id
+        client.create_market_order(client.test_instrument, 1)
+        client.fake_incoming(Incoming.ORDER_STATUS, order_id, 'Submitted', 0, 1, 0, 176952797, 0, 0, 1, '', 0)
+
+    # Each run uses a new event loop, and the status update must be scheduled on the current one
+    for order_id in (1, 2):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(place(order_id))
+        finally:
+            loop.close()
+
+
+def test_order_updates_after_loop_closed():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.create_market_order(client.test_instrument, 1)
+    order = client.get_order(1)
+    updates = []
+
+    def on_updated(_):
+        updates.append(order.status)
+    order.updated += on_updated
+
+    previous_loop = asyncio.get_event_loop()
+    try:
+        # The flush scheduled on this loop never runs, as it is closed without running again
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        client.fake_incoming(Incoming.ORDER_STATUS, 1, 'PreSubmitted', 0, 1, 0, 176952797, 0, 0, 1, '', 0)
+        loop.close()
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        client.fake_incoming(Incoming.ORDER_STATUS, 1, 'Submitted', 0, 1, 0, 176952797, 0, 0, 1, '', 0)
+        run_event_loop()
+        loop.close()
+    finally:
+        asyncio.set_event_loop(previous_loop)
+
+    assert updates == ['Submitted']
+
+
+def test_order_updates_subscriber_error():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    orders = []
+    for order_id in (1, 2):
+        client._next_order_id = order_id
+        client.create_market_order(client.test_instrument, 1)
+        orders.append(client.get_order(order_id))
+
+    updates = []
+
+    def on_updated_1(_):
+        raise ValueError()
+
+    def on_updated_2(_):
+        updates.append(2)
+    orders[0].updated += on_updated_1
+    orders[1].updated += on_updated_2
+
+    # An exception raised by one subscriber doesn't stop the others from being notified
+    for order_id in (1, 2):
+        client.fake_incoming(Incoming.ORDER_STATUS, order_id, 'Submitted', 0, 1, 0, 176952797, 0, 0, 1, '', 0)
+    run_event_loop()
+    assert updates == [2]
+
+
 def test_mk_error():
     client = MixinFixture()
     client.version = ProtocolVersion.MAX_CLIENT
@@ -118,6 +261,20 @@ def test_next_valid_id():
     assert client._next_order_id == 9
 
 
+def test_open_order_before_next_valid_id():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    # An order placed elsewhere, reported before this client's ids are known
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    client.fake_incoming(Incoming.NEXT_VALID_ID, 1, 250000)
+    client.create_market_order(client.test_instrument, 1)
+
+    assert client.get_order(1).trail_stop_price == 184.0
+    assert client.get_order(250000).order_id == 250000
+    assert list(client._OrdersMixin__orders._overflow) == [1]
+
+
 def test_get_orders_empty():
     client = MixinFixture()
     client.version = ProtocolVersion.MAX_CLIENT
@@ -126,7 +283,11 @@ def test_get_orders_empty():
     assert not fut.done()
     client.fake_incoming(Incoming.OPEN_ORDER_END, 1)
     assert fut.done()
-    assert list(fut.result()) == []
+    assert fut.result() == []
+
+    # The result is a snapshot, and doesn't change with later orders
+    client.create_market_order(client.test_instrument, 1)
+    assert fut.result() == []
 
 
 def test_get_orders_1():
@@ -151,3 +312,280 @@ def test_get_orders_1():
     client.fake_incoming(Incoming.OPEN_ORDER_END, 1)
     assert fut.done()
     assert len(fut.result()) == 1
+
+
+def test_order_id_map():
+    id_map = _OrderIdMap()
+    assert id_map.get(5) is None
+    assert 5 not in id_map
+
+    id_map.anchor(5)
+    id_map[5] = 'a'
+    id_map[7] = 'b'
+    id_map[-1] = 'foreign'
+    id_map[5 + _OrderIdMap.GROW_BY + _OrderIdMap.MAX_GAP * 2] = 'far'
+
+    assert id_map.get(5) == 'a'
+    assert id_map.get(6) is None
+    assert id_map.get(7) == 'b'
+    assert id_map.get(-1) == 'foreign'
+    assert 7 in id_map
+    assert sorted(id_map.values()) == ['a', 'b', 'far', 'foreign']
+
+    assert id_map.pop(7) == 'b'
+    assert id_map.pop(7, 'gone') == 'gone'
+    assert id_map.pop(-1) == 'foreign'
+    assert sorted(id_map.values()) == ['a', 'far']
+
+    assert id_map.get_or_create(5, lambda: 'new') == 'a'
+    assert id_map.get_or_create(6, lambda: 'new') == 'new'
+    assert id_map.get_or_create(-2, lambda: 'new foreign') == 'new foreign'
+    assert id_map.get(-2) == 'new foreign'
+    id_map.pop(6)
+    id_map.pop(-2)
+
+    # Growing past the preallocated block
+    id_map[5 + _OrderIdMap.GROW_BY] = 'next'
+    assert id_map.get(5 + _OrderIdMap.GROW_BY) == 'next'
+
+
+def test_open_order_unchanged():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+    assert order.status == 'Submitted'
+    run_event_loop()
+
+    updates = []
+
+    def on_updated(value):
+        updates.append(value)
+
+    order.updated += on_updated
+
+    # An identical snapshot is not decoded again, but still reported
+    order.warning_text = 'local'
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    assert order.warning_text == 'local'
+    run_event_loop()
+    assert updates == [None]
+
+    # Placing the order again invalidates the snapshot
+    client.place_order(order)
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    assert order.warning_text == ''
+    run_event_loop()
+    assert updates == [None, None]
+
+
+def test_get_orders_batched_updates():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+    run_event_loop()
+
+    updates = []
+
+    def on_updated(value):
+        updates.append(value)
+
+    order.updated += on_updated
+
+    # During the replay, the order is only reported once, at the end
+    fut = client.get_open_orders()
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    run_event_loop()
+    assert updates == []
+    client.fake_incoming(Incoming.OPEN_ORDER_END, 1)
+    assert fut.result() == [order]
+    run_event_loop()
+    assert updates == [None]
+
+    # Outside of a replay, updates are reported on the next loop iteration
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    run_event_loop()
+    assert updates == [None, None]
+
+
+def test_get_orders_cancelled():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+    run_event_loop()
+
+    updates = []
+
+    def on_updated(value):
+        updates.append(value)
+
+    order.updated += on_updated
+
+    fut = client.get_open_orders()
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    run_event_loop()
+    assert updates == []
+
+    # Giving up on the replay reports the held back update, and later updates are no longer held back
+    fut.cancel()
+    run_event_loop()
+    run_event_loop()
+    assert updates == [None]
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    run_event_loop()
+    assert updates == [None, None]
+
+    # A late OPEN_ORDER_END is ignored, and a new replay can be started
+    client.fake_incoming(Incoming.OPEN_ORDER_END, 1)
+    fut = client.get_open_orders()
+    assert not fut.done()
+    client.fake_incoming(Incoming.OPEN_ORDER_END, 1)
+    assert fut.result() == [order]
+
+
+def test_open_order_lazy_fields():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+    assert 'trigger_price' not in vars(order)
+
+    assert order.trail_stop_price == 184.0
+    assert order.trigger_price is None
+    assert order.cash_quantity is None
+    assert 'trigger_price' in vars(order)
+
+    with pytest.raises(AttributeError):
+        order.does_not_exist
+
+
+def test_open_order_lazy_fields_assigned():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+
+    # Assigning lazy fields before they are decoded must not lose the assigned values
+    order.cash_quantity = 10.0
+    order.trail_stop_price = 150.0
+    assert order.trigger_price is None
+    assert order.cash_quantity == 10.0
+    assert order.trail_stop_price == 150.0
+
+
+def test_open_order_lazy_fields_after_disconnect():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+
+    # The lazy fields are decoded with the version the message was received with
+    client.version = None
+    assert order.trail_stop_price == 184.0
+    assert order.cash_quantity is None
+
+
+def test_open_order_lazy_fields_failed_decode():
+    client = MixinFixture()
+    client.version = ProtocolVersion.MAX_CLIENT
+
+    client.fake_incoming(*OPEN_ORDER_MESSAGE)
+    order = client.get_order(1)
+
+    # A failed decode can be retried
+    fields, decode = order._lazy_fields
+    order._lazy_fields = (fields, lambda target: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        order.cash_quantity
+    order._lazy_fields = (fields, decode)
+    assert order.cash_quantity is None
+
+
+def test_order_id_map_overflow_moved():
+    id_map = _OrderIdMap()
+    id_map.anchor(1)
+    id_map[1] = 'a'
+    id_map[6000] = 'far'
+
+    # Growing the list to cover id 6000 must not lose the entry stored in the overflow dict
+    id_map[5000] = 'mid'
+    assert id_map.get(6000) == 'far'
+    assert 6000 in id_map
+    assert id_map.get_or_create(6000, lambda: 'new') == 'far'
+    assert sorted(id_map.values()) == ['a', 'far', 'mid']
+    assert id_map.pop(6000) == 'far'
+    assert 6000 not in id_map
+
+
+def test_order_id_map_block_growth():
+    id_map = _OrderIdMap()
+    id_map.anchor(1)
+    id_map[1] = 'first'
+
+    # Scattered ids from earlier sessions, beyond the initial block
+    end = 1 + _OrderIdMap.GROW_BY
+    last = end + _OrderIdMap.GROW_BY - 1
+    scattered = [end + _OrderIdMap.MAX_GAP, end + _OrderIdMap.MAX_GAP + 100, last]
+    for order_id in scattered:
+        id_map[order_id] = order_id
+
+    # A single block growth covers all of them
+    id_map[end] = 'next'
+    for order_id in scattered:
+        assert id_map.get(order_id) == order_id
+    assert id_map._overflow == {}
+    assert len(list(id_map.values())) == len(scattered) + 2
+
+
+def test_order_id_map_anchor():
+    id_map = _OrderIdMap()
+
+    # Ids seen before the client's own range is known don't decide where it starts
+    id_map[0] = 'foreign'
+    id_map[250001] = 'early'
+    id_map.anchor(250000)
+    id_map.anchor(1)
+    for order_id in range(250002, 250010):
+        id_map[order_id] = order_id
+
+    assert id_map._overflow == {0: 'foreign'}
+    assert id_map.get(250001) == 'early'
+    assert id_map.get(250009) == 250009
+
+
+def test_digest_cache():
+    cache = _DigestCache()
+    cache.store(1, 100)
+    assert cache.matches(1, 100)
+    assert not cache.matches(1, 101)
+    assert not cache.matches(2, 100)
+
+    cache.store(1, 101)
+    assert cache.matches(1, 101)
+
+    cache.discard(1)
+    assert not cache.matches(1, 101)
+
+
+def test_digest_cache_eviction(monkeypatch):
+    monkeypatch.setattr(_DigestCache, 'MAX_SIZE', 2)
+    cache = _DigestCache()
+    cache.store(1, 100)
+    cache.store(2, 200)
+    assert cache.matches(1, 100)
+
+    # Order 2 was used least recently, so it is evicted first
+    cache.store(3, 300)
+    assert cache.matches(1, 100)
+    assert not cache.matches(2, 200)
+    assert cache.matches(3, 300)
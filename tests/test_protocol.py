@@ -81,6 +81,35 @@ def test_message_read():
         mk_message_read(UnknownClass, "something")
 
 
+def test_message_read_typed():
+    mock_protocol = mock.MagicMock(version=110)
+
+    msg = IncomingMessage(["2", "10", "2", "", str((1 << 31) - 1), "2.5", str(sys.float_info.max), "1", "0", "",
+                           "foo", "", "20180511  19:17:00", ""], mock_protocol)
+    assert msg.read_int() == 2
+    assert msg.read_int() is None
+    assert msg.read_int() is None
+    assert msg.read_float() == 2.5
+    assert msg.read_float() is None
+    assert msg.read_bool() is True
+    assert msg.read_bool() is False
+    assert msg.read_bool() is None
+    assert msg.read_str() == "foo"
+    assert msg.read_str() == ""
+    assert msg.read_datetime() == datetime.datetime(2018, 5, 11, 19, 17)
+    assert msg.read_datetime() is None
+    assert msg.is_eof
+
+    msg = IncomingMessage(["2", "10", "2", "A", "B", "C", "D", "0", ""], mock_protocol)
+    target = {'A': 'old'}
+    msg.read_str_str_pairs_into(target)
+    assert target == {'A': 'B', 'C': 'D'}
+    msg.read_str_str_pairs_into(target)
+    msg.read_str_str_pairs_into(target)
+    assert target == {'A': 'B', 'C': 'D'}
+    assert msg.is_eof
+
+
 def test_message_invoke_handler():
     result = []
     received_message = None